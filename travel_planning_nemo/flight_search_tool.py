@@ -1,8 +1,23 @@
 import os
-from typing import List, Optional
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
 
-from pydantic import BaseModel, Field
-from tavily import TavilyClient
+from pydantic import BaseModel, ConfigDict, Field
+from tavily import AsyncTavilyClient
+
+# One client per API key so Tavily's HTTP session is reused across searches
+_TAVILY_CACHE: Dict[str, AsyncTavilyClient] = {}
+
+# Short-lived cache of search results; timing advice is always recomputed since
+# it depends on itinerary context that is not part of the search key.
+# Entries are (expires_at, options); a str in place of options marks a failed lookup and holds
+# the error summary (not the exception, whose traceback frames would keep the API key alive).
+_FLIGHT_TTL = 600  # seconds
+_FLIGHT_NEGATIVE_TTL = 30  # seconds, for empty results and Tavily errors
+_FLIGHT_CACHE_MAX = 256
+_FLIGHT_CACHE: "OrderedDict[tuple, Tuple[float, Union[List[FlightOption], str]]]" = OrderedDict()
+_MISS = object()
 
 
 class FlightSearchInput(BaseModel):
@@ -22,18 +37,24 @@ class FlightSearchInput(BaseModel):
 
 
 class FlightOption(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     title: str
     url: str
     snippet: str
 
 
 class FlightTimingAdvice(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     recommended_arrival_window: str
     recommended_departure_window: str
     reasoning: str
 
 
 class FlightSearchOutput(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     query: str
     options: List[FlightOption]
     timing_advice: FlightTimingAdvice
@@ -41,12 +62,51 @@ class FlightSearchOutput(BaseModel):
     note: str
 
 
-def _build_query(i: FlightSearchInput) -> str:
-    if i.return_date:
-        trip = f"round trip {i.depart_date} to {i.return_date}"
+def _get_tavily(api_key: str) -> AsyncTavilyClient:
+    client = _TAVILY_CACHE.get(api_key)
+    if client is None:
+        client = _TAVILY_CACHE[api_key] = AsyncTavilyClient(api_key=api_key)
+    return client
+
+
+def _cache_key(i: FlightSearchInput) -> tuple:
+    return (
+        i.origin.upper().strip(),
+        i.destination.upper().strip(),
+        i.depart_date.strip(),
+        (i.return_date or "").strip(),
+        int(i.adults),
+        i.cabin.lower().strip(),
+        int(i.max_results),
+    )
+
+
+def _cache_get(key: tuple):
+    entry = _FLIGHT_CACHE.get(key)
+    if entry is None:
+        return _MISS
+    if time.monotonic() >= entry[0]:
+        del _FLIGHT_CACHE[key]
+        return _MISS
+    _FLIGHT_CACHE.move_to_end(key)
+    return entry[1]
+
+
+def _cache_set(key: tuple, options: Union[List[FlightOption], str], ttl: float) -> None:
+    _FLIGHT_CACHE[key] = (time.monotonic() + ttl, options)
+    _FLIGHT_CACHE.move_to_end(key)
+    while len(_FLIGHT_CACHE) > _FLIGHT_CACHE_MAX:
+        _FLIGHT_CACHE.popitem(last=False)
+
+
+def _build_query(key: tuple) -> str:
+    # Built from the normalized cache key so cached results always match the reported query
+    origin, destination, depart_date, return_date, adults, cabin, _ = key
+    if return_date:
+        trip = f"round trip {depart_date} to {return_date}"
     else:
-        trip = f"one way {i.depart_date}"
-    return f"flights {i.origin} to {i.destination} {trip} {i.adults} adults {i.cabin} prices"
+        trip = f"one way {depart_date}"
+    return f"flights {origin} to {destination} {trip} {adults} adults {cabin} prices"
 
 
 def _timing_advice(i: FlightSearchInput) -> FlightTimingAdvice:
@@ -69,43 +129,47 @@ def _timing_advice(i: FlightSearchInput) -> FlightTimingAdvice:
         depart = "Depart evening (17:00–22:00) to maximize final day"
         reasons.append("Fast/packed pace → maximize usable daylight hours.")
 
-    if "avoid" in (i.constraints or "").lower() and "early" in (i.constraints or "").lower():
+    constraints = (i.constraints or "").lower()
+    if "avoid" in constraints and "early" in constraints:
         depart = "Depart afternoon/evening (13:00–21:00) to avoid early departures"
         reasons.append("Constraint mentions avoiding early times.")
 
-    if "avoid long commutes" in (i.constraints or "").lower():
+    if "avoid long commutes" in constraints:
         reasons.append("Avoid long commutes → prefer arrival that avoids peak transit if possible.")
 
     reasons.append(f"Day start time is {i.day_start_time} → flights that don’t force a 04:00 wake-up are preferable.")
     reasoning = " ".join(reasons).strip() or "General travel comfort + check-in/check-out practicality."
 
-    return FlightTimingAdvice(
+    return FlightTimingAdvice.model_construct(
         recommended_arrival_window=arrival,
         recommended_departure_window=depart,
         reasoning=reasoning,
     )
 
 
+def _flight_context_md_from_parts(query: str, advice: FlightTimingAdvice, options: List[FlightOption]) -> str:
+    link_lines = [f"- [{o.title}]({o.url})" if o.url else f"- {o.title}" for o in options[:5]]
+    return "\n".join(
+        [
+            "**Flight shopping summary (web results):**",
+            f"- Query: `{query}`",
+            f"- Arrival window: {advice.recommended_arrival_window}",
+            f"- Departure window: {advice.recommended_departure_window}",
+            f"- Why: {advice.reasoning}",
+            "",
+            "**Where to check live prices/availability:**",
+            *link_lines,
+            "",
+            "_Note: Prices/availability change frequently; open links for live details._",
+        ]
+    )
+
+
 def flight_context_md(out: FlightSearchOutput) -> str:
     """
     A compact Markdown block that the itinerary tool can embed directly.
     """
-    lines = []
-    lines.append("**Flight shopping summary (web results):**")
-    lines.append(f"- Query: `{out.query}`")
-    lines.append(f"- Arrival window: {out.timing_advice.recommended_arrival_window}")
-    lines.append(f"- Departure window: {out.timing_advice.recommended_departure_window}")
-    lines.append(f"- Why: {out.timing_advice.reasoning}")
-    lines.append("")
-    lines.append("**Where to check live prices/availability:**")
-    for opt in out.options[: min(5, len(out.options))]:
-        if opt.url:
-            lines.append(f"- [{opt.title}]({opt.url})")
-        else:
-            lines.append(f"- {opt.title}")
-    lines.append("")
-    lines.append("_Note: Prices/availability change frequently; open links for live details._")
-    return "\n".join(lines)
+    return _flight_context_md_from_parts(out.query, out.timing_advice, out.options)
 
 
 async def flight_search_tool(input_data: FlightSearchInput) -> FlightSearchOutput:
@@ -113,35 +177,53 @@ async def flight_search_tool(input_data: FlightSearchInput) -> FlightSearchOutpu
     if not api_key:
         raise RuntimeError("Missing TAVILY_API_KEY. Add it to .env (not only .env.template).")
 
-    query = _build_query(input_data)
+    key = _cache_key(input_data)
+    query = _build_query(key)
 
-    tavily = TavilyClient(api_key=api_key)
-    resp = tavily.search(
-        query=query,
-        max_results=input_data.max_results,
-        include_answer=False,
-        include_raw_content=False,
-    )
-
-    results = resp.get("results", []) or []
-    options: List[FlightOption] = []
-    for r in results[: input_data.max_results]:
-        options.append(
-            FlightOption(
-                title=str(r.get("title") or "Flight result").strip(),
-                url=str(r.get("url") or "").strip(),
-                snippet=str(r.get("content") or "").strip()[:300],
+    cached = _cache_get(key)
+    if isinstance(cached, str):
+        raise RuntimeError(f"Flight search failed: {cached} (cached; try again shortly).")
+    if cached is not _MISS:
+        options = list(cached)
+    else:
+        tavily = _get_tavily(api_key)
+        try:
+            resp = await tavily.search(
+                query=query,
+                max_results=input_data.max_results,
+                include_answer=False,
+                include_raw_content=False,
             )
-        )
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            _cache_set(key, error, _FLIGHT_NEGATIVE_TTL)
+            raise RuntimeError(f"Flight search failed: {error}") from exc
+
+        results = resp.get("results", []) or []
+        options: List[FlightOption] = []
+        for r in results[: input_data.max_results]:
+            raw = r.get("content") or ""
+            if not isinstance(raw, str):
+                raw = str(raw)
+            options.append(
+                FlightOption.model_construct(
+                    title=str(r.get("title") or "Flight result").strip(),
+                    url=str(r.get("url") or "").strip(),
+                    # Slice before stripping so long page content isn't copied in full
+                    snippet=raw[:400].strip()[:300],
+                )
+            )
+
+        _cache_set(key, list(options), _FLIGHT_TTL if options else _FLIGHT_NEGATIVE_TTL)
 
     advice = _timing_advice(input_data)
 
-    out = FlightSearchOutput(
+    # Output models are assembled from values built above (all plain str/lists of
+    # our own models), so validation is skipped via model_construct().
+    return FlightSearchOutput.model_construct(
         query=query,
         options=options,
         timing_advice=advice,
-        flight_context_markdown="",  # filled next
+        flight_context_markdown=_flight_context_md_from_parts(query, advice, options),
         note="Web-based flight discovery only; not a booking system. Use links for live prices and schedules.",
     )
-    out.flight_context_markdown = flight_context_md(out)
-    return out
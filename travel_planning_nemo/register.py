@@ -1,18 +1,26 @@
-from typing import Optional
+import logging
+from typing import Any, Dict, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 from nat.builder.function_info import FunctionInfo
 from nat.cli.register_workflow import register_function
 from nat.data_models.function import FunctionBaseConfig
 
-from .travel_planning_nemo import NvidiaChatConfig, build_user_prompt, call_nvidia_chat_completion
+from .travel_planning_nemo import (
+    NvidiaChatConfig,
+    build_user_prompt,
+    call_nvidia_chat_completion,
+    nvidia_client_session,
+)
 from .flight_search_tool import (
     FlightSearchInput,
     FlightSearchOutput,
     flight_search_tool,
 )
 
+logger = logging.getLogger(__name__)
+
 
 # -------------------------
 # Itinerary Tool
@@ -48,9 +56,27 @@ class TravelItineraryInput(BaseModel):
 
 
 class TravelItineraryOutput(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     itinerary_markdown: str = Field(description="Full itinerary in Markdown")
 
 
+_ITINERARY_SYSTEM_PROMPT = (
+    "You are a travel planner.\n"
+    "Return ONLY the itinerary in Markdown.\n"
+    "Follow the provided template headings exactly.\n"
+    "Do not include analysis or tool/action text.\n"
+)
+
+
+async def _generate_itinerary(cfg: NvidiaChatConfig, trip_request: Dict[str, Any]) -> TravelItineraryOutput:
+    user_prompt = build_user_prompt(trip_request)
+    itinerary_md = await call_nvidia_chat_completion(
+        cfg=cfg, system_prompt=_ITINERARY_SYSTEM_PROMPT, user_prompt=user_prompt
+    )
+    return TravelItineraryOutput(itinerary_markdown=itinerary_md)
+
+
 class TravelItineraryConfig(FunctionBaseConfig, name="travel_itinerary"):
     pass
 
@@ -59,27 +85,18 @@ class TravelItineraryConfig(FunctionBaseConfig, name="travel_itinerary"):
 async def travel_itinerary(config: TravelItineraryConfig, builder):
     async def _inner(input_data: TravelItineraryInput) -> TravelItineraryOutput:
         cfg = NvidiaChatConfig.from_env()
-
-        system_prompt = (
-            "You are a travel planner.\n"
-            "Return ONLY the itinerary in Markdown.\n"
-            "Follow the provided template headings exactly.\n"
-            "Do not include analysis or tool/action text.\n"
+        return await _generate_itinerary(cfg, input_data.model_dump())
+
+    async with nvidia_client_session():
+        yield FunctionInfo.from_fn(
+            _inner,
+            description=(
+                "Generate the FINAL trip itinerary in Markdown using the predefined template. "
+                "If flight_context_markdown / arrival_window / departure_window are provided, "
+                "integrate them into the Flights section and align Day 1 and the last day accordingly."
+            ),
         )
 
-        user_prompt = build_user_prompt(input_data.model_dump())
-        itinerary_md = await call_nvidia_chat_completion(cfg=cfg, system_prompt=system_prompt, user_prompt=user_prompt)
-        return TravelItineraryOutput(itinerary_markdown=itinerary_md)
-
-    yield FunctionInfo.from_fn(
-        _inner,
-        description=(
-            "Generate the FINAL trip itinerary in Markdown using the predefined template. "
-            "If flight_context_markdown / arrival_window / departure_window are provided, "
-            "integrate them into the Flights section and align Day 1 and the last day accordingly."
-        ),
-    )
-
 
 # -------------------------
 # Flight Search Tool (Tavily)
@@ -102,3 +119,67 @@ async def flight_search(config: FlightSearchConfig, builder):
             "tailor arrival/departure window recommendations to fit the trip plan."
         ),
     )
+
+
+# -------------------------
+# Full Plan Tool (flights + itinerary in one call)
+# -------------------------
+
+class TravelPlanFullConfig(FunctionBaseConfig, name="travel_plan_full"):
+    pass
+
+
+@register_function(config_type=TravelPlanFullConfig)
+async def travel_plan_full(config: TravelPlanFullConfig, builder):
+    async def _inner(input_data: TravelItineraryInput) -> TravelItineraryOutput:
+        cfg = NvidiaChatConfig.from_env()
+        trip_request = input_data.model_dump()
+
+        has_flight_context = (
+            input_data.flight_context_markdown and input_data.arrival_window and input_data.departure_window
+        )
+        if input_data.origin and not has_flight_context:
+            flight_in = FlightSearchInput(
+                origin=input_data.origin,
+                destination=input_data.destination,
+                depart_date=input_data.start_date,
+                return_date=input_data.end_date,
+                adults=input_data.adults,
+                cabin=input_data.cabin,
+                day_start_time=input_data.day_start_time,
+                pace=input_data.pace,
+                constraints=input_data.constraints,
+                special_requests=input_data.special_requests,
+            )
+            try:
+                flight_out = await flight_search_tool(flight_in)
+            except RuntimeError as exc:
+                # Missing TAVILY_API_KEY or a (possibly cached) Tavily failure. Still plan the
+                # trip, but say in the itinerary that flights were skipped.
+                logger.warning("travel_plan_full: flight search failed, continuing without flights", exc_info=True)
+                if not input_data.flight_context_markdown:
+                    trip_request["flight_context_markdown"] = f"Flight search unavailable: {exc}"
+            else:
+                # Explicit values from the caller win over the fresh search
+                advice = flight_out.timing_advice
+                trip_request["flight_context_markdown"] = (
+                    input_data.flight_context_markdown or flight_out.flight_context_markdown
+                )
+                trip_request["arrival_window"] = input_data.arrival_window or advice.recommended_arrival_window
+                trip_request["departure_window"] = (
+                    input_data.departure_window or advice.recommended_departure_window
+                )
+
+        return await _generate_itinerary(cfg, trip_request)
+
+    async with nvidia_client_session():
+        yield FunctionInfo.from_fn(
+            _inner,
+            description=(
+                "Plan a full trip in one step: when origin is provided, search flights and feed the "
+                "flight summary and arrival/departure windows into the itinerary, then return the "
+                "FINAL itinerary in Markdown. Use this instead of calling flight_search and "
+                "itinerary_tool separately. If the flight search fails, the itinerary's flight "
+                "context says 'Flight search unavailable' and the plan is built without flights."
+            ),
+        )
@@ -1,13 +1,27 @@
+import asyncio
+import contextlib
+import functools
 import os
+import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict
 
 import httpx
+import orjson
 from dotenv import load_dotenv
 
 TEMPLATE_PATH = Path(__file__).parent / "templates" / "itinerary_template_v1.md"
 
+_TOKEN_RE = re.compile(r"\{\{(\w+)\}\}")
+
+# Shared HTTP/2 client so connections to the NVIDIA API are reused (and multiplexed) across calls.
+# Its connections are bound to the event loop that created it, so the loop is tracked too.
+_HTTP_CLIENT: httpx.AsyncClient | None = None
+_HTTP_CLIENT_LOOP: asyncio.AbstractEventLoop | None = None
+# Number of registered tools currently holding the client (see nvidia_client_session)
+_HTTP_CLIENT_USERS = 0
+
 
 @dataclass(frozen=True)
 class NvidiaChatConfig:
@@ -20,47 +34,131 @@ class NvidiaChatConfig:
 
     @staticmethod
     def from_env() -> "NvidiaChatConfig":
-        load_dotenv()
-
-        base_url = os.getenv("NVIDIA_BASE_URL", "https://integrate.api.nvidia.com/v1").rstrip("/")
-        api_key = os.getenv("NVIDIA_API_KEY", "")
-        model_name = os.getenv("MODEL_NAME", "meta/llama-3.1-70b-instruct")
-
-        if not api_key:
-            raise RuntimeError("Missing NVIDIA_API_KEY. Create .env and set NVIDIA_API_KEY.")
-
-        def _f(name: str, default: float) -> float:
-            v = os.getenv(name)
-            return float(v) if v else default
-
-        def _i(name: str, default: int) -> int:
-            v = os.getenv(name)
-            return int(v) if v else default
-
-        return NvidiaChatConfig(
-            base_url=base_url,
-            api_key=api_key,
-            model_name=model_name,
-            temperature=_f("TEMPERATURE", 0.7),
-            top_p=_f("TOP_P", 0.9),
-            max_tokens=_i("MAX_TOKENS", 2048),
+        return _config_from_env()
+
+
+# (env var, config field, parser, default) for the optional sampling settings
+_ENV_SPEC = (
+    ("TEMPERATURE", "temperature", float, 0.7),
+    ("TOP_P", "top_p", float, 0.9),
+    ("MAX_TOKENS", "max_tokens", int, 2048),
+)
+
+
+@functools.cache
+def _config_from_env() -> NvidiaChatConfig:
+    # Parsed once per process; the dataclass is frozen so sharing it is safe
+    load_dotenv()
+    env = os.environ
+
+    base_url = env.get("NVIDIA_BASE_URL", "https://integrate.api.nvidia.com/v1").rstrip("/")
+    api_key = env.get("NVIDIA_API_KEY", "")
+    model_name = env.get("MODEL_NAME", "meta/llama-3.1-70b-instruct")
+
+    if not api_key:
+        raise RuntimeError("Missing NVIDIA_API_KEY. Create .env and set NVIDIA_API_KEY.")
+
+    tuning = {field: parse(env.get(name) or default) for name, field, parse, default in _ENV_SPEC}
+
+    return NvidiaChatConfig(
+        base_url=base_url,
+        api_key=api_key,
+        model_name=model_name,
+        **tuning,
+    )
+
+
+def _discard_client(client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop | None) -> None:
+    """
+    Close a client owned by another event loop. If that loop is still running
+    the close is scheduled on it; otherwise its sockets belong to a stopped or
+    closed loop and can't be closed from here, so they are left to the GC.
+    """
+    if client.is_closed or loop is None or not loop.is_running():
+        return
+    asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _HTTP_CLIENT, _HTTP_CLIENT_LOOP
+    loop = asyncio.get_running_loop()
+    if _HTTP_CLIENT is not None and _HTTP_CLIENT_LOOP is not loop:
+        _discard_client(_HTTP_CLIENT, _HTTP_CLIENT_LOOP)
+        _HTTP_CLIENT = None
+    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
+        _HTTP_CLIENT = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(60, connect=10),
+            limits=httpx.Limits(max_keepalive_connections=10, max_connections=20, keepalive_expiry=60),
         )
+        _HTTP_CLIENT_LOOP = loop
+    return _HTTP_CLIENT
 
 
+async def aclose() -> None:
+    """
+    Close the shared HTTP client (call on shutdown).
+    """
+    global _HTTP_CLIENT, _HTTP_CLIENT_LOOP
+    client, loop = _HTTP_CLIENT, _HTTP_CLIENT_LOOP
+    _HTTP_CLIENT = _HTTP_CLIENT_LOOP = None
+    if client is None:
+        return
+    if loop is asyncio.get_running_loop():
+        await client.aclose()
+    else:
+        _discard_client(client, loop)
+
+
+@contextlib.asynccontextmanager
+async def nvidia_client_session() -> AsyncIterator[None]:
+    """
+    Hold the shared HTTP client for the lifetime of a registered tool.
+    The client is closed when the last holder exits.
+    """
+    global _HTTP_CLIENT_USERS
+    _HTTP_CLIENT_USERS += 1
+    try:
+        yield
+    finally:
+        _HTTP_CLIENT_USERS -= 1
+        if _HTTP_CLIENT_USERS == 0:
+            await aclose()
+
+
+@functools.lru_cache(maxsize=1)
 def load_template_text() -> str:
+    # The template is static; read it on first use and reuse it for the process
     return TEMPLATE_PATH.read_text(encoding="utf-8")
 
 
 def render_template(template: str, values: Dict[str, Any]) -> str:
-    out = template
-    for k, v in values.items():
-        out = out.replace(f"{{{{{k}}}}}", str(v))
-    return out
+    return _TOKEN_RE.sub(lambda m: str(values.get(m.group(1), m.group(0))), template)
 
 
-def build_user_prompt(trip_request: Dict[str, Any]) -> str:
-    template = load_template_text()
+_PROMPT_PREAMBLE = (
+    "Generate a complete itinerary using the template below.\n\n"
+    "Hard requirements:\n"
+    "- Follow the template headings exactly.\n"
+    "- Include 2 optional swaps per day.\n"
+    "- Add realistic transit notes and cost ranges.\n"
+    "- Output only Markdown.\n"
+    "- Do not mention that you are using a template.\n\n"
+    "Integration rules:\n"
+    "- If Flight Context is provided, align Day 1 and last day with the arrival/departure assumptions.\n"
+    "- Do not invent exact flight prices or guaranteed schedules.\n\n"
+)
 
+_PROMPT_TAIL_FMT = (
+    "Extra constraints (if any): {c}\n"
+    "Special requests (if any): {s}\n\n"
+    "TEMPLATE (filled inputs):\n"
+    "-------------------------\n"
+    "{t}\n"
+)
+
+
+def build_user_prompt(trip_request: Dict[str, Any]) -> str:
     # Flight integration fields (may be filled by agent after calling flight_search)
     flight_context = trip_request.get("flight_context_markdown") or "Flight details not provided."
     arrival_window = trip_request.get("arrival_window") or "Not specified"
@@ -83,43 +181,35 @@ def build_user_prompt(trip_request: Dict[str, Any]) -> str:
         "departure_window": departure_window,
     }
 
-    filled_template = render_template(template, values)
+    filled_template = render_template(load_template_text(), values)
 
     constraints = trip_request.get("constraints", "")
     special = trip_request.get("special_requests", "")
 
-    return (
-        "Generate a complete itinerary using the template below.\n\n"
-        "Hard requirements:\n"
-        "- Follow the template headings exactly.\n"
-        "- Include 2 optional swaps per day.\n"
-        "- Add realistic transit notes and cost ranges.\n"
-        "- Output only Markdown.\n"
-        "- Do not mention that you are using a template.\n\n"
-        "Integration rules:\n"
-        "- If Flight Context is provided, align Day 1 and last day with the arrival/departure assumptions.\n"
-        "- Do not invent exact flight prices or guaranteed schedules.\n\n"
-        f"Extra constraints (if any): {constraints}\n"
-        f"Special requests (if any): {special}\n\n"
-        "TEMPLATE (filled inputs):\n"
-        "-------------------------\n"
-        f"{filled_template}\n"
-    )
+    return _PROMPT_PREAMBLE + _PROMPT_TAIL_FMT.format(c=constraints, s=special, t=filled_template)
 
 
-async def call_nvidia_chat_completion(
+# Helps prevent ReAct artifacts if the model tries to emit them
+_STOP_TOKENS = ("\n\nObservation:", "\n\nAction:", "\n\nThought:")
+
+_STATIC_HEADERS = {
+    "Accept": "text/event-stream",
+    "Content-Type": "application/json",
+}
+
+
+async def stream_nvidia_chat_completion(
     *,
     cfg: NvidiaChatConfig,
     system_prompt: str,
     user_prompt: str,
-) -> str:
+) -> AsyncIterator[str]:
+    """
+    Stream the completion over SSE, yielding content deltas as they arrive.
+    """
     url = f"{cfg.base_url}/chat/completions"
 
-    headers = {
-        "Authorization": f"Bearer {cfg.api_key}",
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-    }
+    headers = {**_STATIC_HEADERS, "Authorization": f"Bearer {cfg.api_key}"}
 
     payload = {
         "model": cfg.model_name,
@@ -130,14 +220,46 @@ async def call_nvidia_chat_completion(
         "temperature": cfg.temperature,
         "top_p": cfg.top_p,
         "max_tokens": cfg.max_tokens,
-        "stream": False,
-        # Helps prevent ReAct artifacts if the model tries to emit them
-        "stop": ["\n\nObservation:", "\n\nAction:", "\n\nThought:"],
+        "stream": True,
+        "stop": _STOP_TOKENS,
     }
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(url, headers=headers, json=payload)
+    client = _get_client()
+    async with client.stream("POST", url, headers=headers, content=orjson.dumps(payload)) as resp:
         resp.raise_for_status()
-        data = resp.json()
+        async for line in resp.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
 
-    return data["choices"][0]["message"]["content"]
+            frame = orjson.loads(data)
+            if "error" in frame:
+                raise RuntimeError(f"NVIDIA API stream error: {frame['error']}")
+
+            choices = frame.get("choices") or []
+            if not choices:
+                continue
+            delta = (choices[0].get("delta") or {}).get("content")
+            if delta:
+                yield delta
+
+
+async def call_nvidia_chat_completion(
+    *,
+    cfg: NvidiaChatConfig,
+    system_prompt: str,
+    user_prompt: str,
+) -> str:
+    chunks = [
+        chunk
+        async for chunk in stream_nvidia_chat_completion(
+            cfg=cfg,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+        )
+    ]
+    if not chunks:
+        raise RuntimeError("NVIDIA API stream ended without any completion content.")
+    return "".join(chunks)